@@ -4,169 +4,325 @@ Agent CLI - Terminal-based application for working with AI agents
 """
 
 import asyncio
+import base64
 import json
+import logging
 import os
+import re
+import shutil
+import signal
+import subprocess
 import sys
 import time
+import uuid
+from functools import singledispatch
 from pathlib import Path
-from typing import List, Optional, Dict, Any, Tuple
-from enum import Enum
+from typing import Any
+
+try:
+    import orjson
+    # orjson options used for debug output of chunks
+    JSON_DISPLAY_OPTIONS = orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS
+except ImportError:
+    # Fall back to the stdlib encoder when orjson isn't installed
+    orjson = None
+
+try:
+    import uvloop
+    # Each command drives its whole session on one event loop; use uvloop's when available
+    run_async = uvloop.run
+except ImportError:
+    run_async = asyncio.run
 
 import typer
 from rich.console import Console
 from rich.panel import Panel
-from rich.prompt import Prompt, Confirm
+from rich.rule import Rule
+from rich.prompt import Prompt, IntPrompt, Confirm
 from rich.table import Table
-from rich.markdown import Markdown
-from rich.progress import Progress, SpinnerColumn, TextColumn
-from rich.live import Live
 from rich import print as rprint
 from rich.box import ROUNDED
-from rich.syntax import Syntax
-from dotenv import load_dotenv
-
-from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from rich.text import Text
 
-# Import agent-related modules
-try:
-    from agents_forge.core_agent.agent import generate_core_agent
-    from agents_forge.agents_generation.generator import generate_agent_from_config
-    from agents_forge.agents_generation.config_schema import AgentConfig
-except ImportError:
-    rprint("[bold red]Error:[/bold red] Required modules not found. Make sure you have the agent_forge package installed.")
-    sys.exit(1)
+# LangChain and the agents_forge modules (LangGraph, LLM clients) are imported lazily by
+# the commands that use them, so e.g. `list` starts without loading them.
 
-# Load environment variables from .env file
-load_dotenv(override=True)
+def load_agent_modules():
+    """Load environment variables for the LLM clients and import the agent-related modules."""
+    # Load environment variables from .env file
+    from dotenv import load_dotenv
+    load_dotenv(override=True)
+    
+    try:
+        import agents_forge.core_agent.agent
+        import agents_forge.agents_generation.generator
+        register_message_extractors()
+    except ImportError:
+        rprint("[bold red]Error:[/bold red] Required modules not found. Make sure you have the agent_forge package installed.")
+        sys.exit(1)
 
 # Initialize typer app and rich console
 app = typer.Typer(help="CLI application for working with AI agents")
 console = Console()
 
+logger = logging.getLogger(__name__)
+
 # Configuration
 AGENTS_DIR = Path("agent_configs")
 DEFAULT_THREAD_ID = "cli_agent_test"
 
+# Show raw chunk details (JSON panels) while streaming; set by the --verbose option
+VERBOSE = False
+
+# Largest chunk dump written in full; longer dumps (big blueprints, tool output) are cut
+MAX_CHUNK_DISPLAY_BYTES = 32_000
+
 def setup():
     """Set up the application and create necessary directories."""
     os.makedirs(AGENTS_DIR, exist_ok=True)
     rprint("[bold green]✅ Application setup complete[/bold green]")
 
-def safe_object_to_dict(obj):
-    """Safely convert an object to a dictionary for display purposes."""
-    if obj is None:
-        return None
-    
-    # If it's a simple type, return as is
-    if isinstance(obj, (str, int, float, bool, type(None))):
-        return obj
-    
-    # If it's a list, convert each item
-    if isinstance(obj, (list, tuple)):
-        return [safe_object_to_dict(item) for item in obj]
-    
-    # If it's a dict, convert values
-    if isinstance(obj, dict):
-        return {k: safe_object_to_dict(v) for k, v in obj.items()}
-    
+# Types returned as-is by safe_object_to_dict
+PRIMITIVE_TYPES = (str, int, float, bool, type(None))
+EXACT_PRIMITIVE_TYPES = frozenset(PRIMITIVE_TYPES)
+
+def _expand_sequence(obj):
+    """Convert a list or tuple: returns the result list and its (index, item) children."""
+    return [None] * len(obj), enumerate(obj)
+
+def _expand_mapping(obj):
+    """Convert a dict: returns the result dict and its (key, value) children."""
+    return dict.fromkeys(obj), obj.items()
+
+def _expand_model(obj):
+    """Convert a pydantic model (messages, AgentConfig): it dumps itself much faster than reflection."""
+    try:
+        return obj.model_dump(mode="json"), ()
+    except Exception:
+        return _expand_object(obj)
+
+def _expand_object(obj):
+    """Convert any other object: returns the result and the children still to convert."""
     # Special handling for common objects
     # Check for NextStep or similar objects
     if hasattr(obj, "name") and hasattr(obj, "args"):
-        return {
-            "name": obj.name,
-            "args": safe_object_to_dict(obj.args) if hasattr(obj.args, "__dict__") else obj.args
-        }
+        result = {"name": obj.name, "args": obj.args}
+        return result, [("args", obj.args)] if hasattr(obj.args, "__dict__") else ()
     
-    # If it has __dict__, use that
+    # If it has __dict__, use that (skipping private attributes)
     if hasattr(obj, "__dict__"):
-        result = {}
-        for k, v in obj.__dict__.items():
-            # Skip private attributes
-            if not k.startswith('_'):
-                result[k] = safe_object_to_dict(v)
-        return result
+        children = [(k, v) for k, v in obj.__dict__.items() if not k.startswith('_')]
+        return dict.fromkeys(k for k, _ in children), children
     
     # Try to see if it implements the mapping protocol
     try:
         if hasattr(obj, "items"):
-            return {k: safe_object_to_dict(v) for k, v in obj.items()}
-    except:
+            children = list(obj.items())
+            return dict.fromkeys(k for k, _ in children), children
+    except Exception:
         pass
     
     # Otherwise convert to string
-    return str(obj)
+    return str(obj), ()
+
+# Converters looked up by exact type; seeded with the common containers, other types
+# are added by _resolve_converter the first time they are seen
+CONVERTERS = {list: _expand_sequence, tuple: _expand_sequence, dict: _expand_mapping}
+
+def _resolve_converter(cls):
+    """Pick the converter for a type not seen before and remember it in CONVERTERS."""
+    if issubclass(cls, (list, tuple)):
+        converter = _expand_sequence
+    elif issubclass(cls, dict):
+        converter = _expand_mapping
+    elif callable(getattr(cls, "model_dump", None)):
+        converter = _expand_model
+    else:
+        converter = _expand_object
+    CONVERTERS[cls] = converter
+    return converter
 
-def display_chunk_info(chunk, response_content=None):
-    """Display detailed information about a streaming chunk."""
+def safe_object_to_dict(obj, memo=None):
+    """
+    Safely convert an object to a dictionary for display purposes.
+    
+    The structure is walked with an explicit stack rather than recursion. memo maps id()
+    of already converted objects to their result, so objects shared within one structure
+    (e.g. messages referenced from several places) are walked once.
+    """
+    if memo is None:
+        memo = {}
+    
+    # Each stack entry is (object to convert, container receiving the result, slot in it)
+    root = [None]
+    stack = [(obj, root, 0)]
+    while stack:
+        value, parent, slot = stack.pop()
+        
+        # If it's a simple type, keep it as is
+        if type(value) in EXACT_PRIMITIVE_TYPES or isinstance(value, PRIMITIVE_TYPES):
+            parent[slot] = value
+            continue
+        
+        cached = memo.get(id(value))
+        if cached is not None:
+            parent[slot] = cached[1]
+            continue
+        
+        converter = CONVERTERS.get(type(value)) or _resolve_converter(type(value))
+        result, children = converter(value)
+        # Keep a reference to value so its id can't be reused by another object during the walk
+        memo[id(value)] = (value, result)
+        parent[slot] = result
+        stack.extend((child, result, key) for key, child in children)
+    
+    return root[0]
+
+def dump_json(obj):
+    """Serialize an object to indented JSON bytes, converting unsupported types with safe_object_to_dict."""
+    # One memo per call: objects reached several times are converted only once
+    memo = {}
+    default = lambda value: safe_object_to_dict(value, memo)
+    if orjson is None:
+        return json.dumps(obj, indent=2, default=default).encode()
+    return orjson.dumps(obj, default=default, option=JSON_DISPLAY_OPTIONS)
+
+def display_chunk_info(chunk, response_parts=None):
+    """
+    Display detailed information about a streaming chunk.
+    
+    If response_parts is a list, the content of message chunks is appended to it.
+    """
+    from langchain_core.messages import BaseMessage
+    
     # Get the chunk type
-    chunk_type = "Message" if hasattr(chunk, "content") and chunk.content else "State Update"
+    is_message = isinstance(chunk, BaseMessage) and bool(chunk.content)
     
     # If it's a message and we're accumulating content, add to the response
-    if chunk_type == "Message" and response_content is not None:
-        response_content += chunk.content
+    if is_message and response_parts is not None:
+        response_parts.append(chunk.content)
     
-    # Convert to dictionary for display
-    chunk_dict = safe_object_to_dict(chunk)
+    try:
+        # Serialize natively; only unsupported objects go through safe_object_to_dict
+        json_bytes = dump_json(chunk)
+    except Exception as e:
+        rprint(f"Error displaying chunk info: {safe_format(str(e))}")
+        return response_parts
     
-    # Render appropriate panel based on chunk type
-    if chunk_type == "Message":
+    # Render appropriate header based on chunk type
+    if is_message:
         # It's a message from the agent
-        rprint(Panel(json.dumps(chunk_dict, indent=2, default=str), 
-                    title="Message Chunk", 
-                    border_style="green"))
+        console.print(Rule("Message Chunk", style="green"))
     else:
         # Special handling for planned_step if present
-        if isinstance(chunk_dict, dict) and "planned_step" in chunk_dict:
-            planned_step = chunk_dict.get("planned_step")
-            if planned_step:
-                rprint(Panel(f"Next step: {planned_step}",
-                            title="Next Step",
-                            border_style="magenta"))
+        planned_step = chunk.get("planned_step") if isinstance(chunk, dict) else getattr(chunk, "planned_step", None)
+        if planned_step:
+            console.print(Panel(f"Next step: {planned_step}", title="Next Step", border_style="magenta"))
         
         # Show all state updates in a simplified way
-        try:
-            # Format for better readability
-            formatted_json = json.dumps(chunk_dict, indent=2, default=str)
-            rprint(Panel(formatted_json, 
-                        title="State Update", 
-                        border_style="blue"))
-        except Exception as e:
-            rprint(f"Error displaying chunk info: {safe_format(str(e))}")
-    
-    # Return the updated response content if we're tracking it
-    return response_content
+        console.print(Rule("State Update", style="blue"))
+    
+    # Cut oversized dumps at a line boundary so one chunk can't flood the terminal
+    if len(json_bytes) > MAX_CHUNK_DISPLAY_BYTES:
+        cut = json_bytes.rfind(b"\n", 0, MAX_CHUNK_DISPLAY_BYTES)
+        if cut <= 0:
+            cut = MAX_CHUNK_DISPLAY_BYTES
+        json_bytes = b"%s\n... <truncated %d bytes>" % (json_bytes[:cut], len(json_bytes) - cut)
+    
+    # Write the JSON bytes straight to stdout instead of building a str for a Rich panel
+    sys.stdout.flush()
+    sys.stdout.buffer.write(json_bytes + b"\n")
+    sys.stdout.buffer.flush()
+    
+    # Return the response parts if we're tracking them
+    return response_parts
+
+# Doubles braces in a single pass over the text
+FORMAT_ESCAPES = str.maketrans({"{": "{{", "}": "}}"})
 
 def safe_format(text):
     """Escape any format specifiers in the text to safely use in f-strings."""
     if not text:
         return text
+    text = str(text)
+    # Nothing to escape: return the string as-is without copying it
+    if "{" not in text and "}" not in text:
+        return text
     # Replace any potential format specifiers
-    return str(text).replace("{", "{{").replace("}", "}}")
+    return text.translate(FORMAT_ESCAPES)
 
-def display_image_in_terminal(image_path):
-    """Display an image in the terminal if possible."""
-    # Placeholder for terminal image display
-    # This will be implementation-specific based on your environment
+# Terminals that understand the iTerm2 inline image protocol
+ITERM_IMAGE_TERMINALS = ("iTerm.app", "WezTerm")
+# Kitty graphics protocol payloads are sent in chunks of at most this many base64 bytes
+KITTY_CHUNK_SIZE = 4096
+# imgcat is resolved once; it's only used when the escape sequences can't be written directly
+IMGCAT_PATH = shutil.which("imgcat")
+
+def inline_image_protocol():
+    """Return the inline image protocol supported by the terminal ("iterm", "kitty") or None."""
+    if os.environ.get("TERM_PROGRAM") in ITERM_IMAGE_TERMINALS:
+        return "iterm"
+    if "KITTY_WINDOW_ID" in os.environ:
+        return "kitty"
+    return None
+
+def display_image_bytes(data):
+    """Display PNG image data in the terminal if possible."""
+    # Write the terminal's inline image escape sequence directly instead of spawning imgcat
+    protocol = inline_image_protocol()
+    if protocol is None:
+        return False
+    
     try:
-        # Try to display the image using ITerm2's imgcat script
-        os.system(f"imgcat {image_path}")
+        encoded = base64.b64encode(data).decode("ascii")
+        
+        if protocol == "iterm":
+            sys.stdout.write(f"\033]1337;File=inline=1;size={len(data)}:{encoded}\a\n")
+        else:
+            chunks = [encoded[i:i + KITTY_CHUNK_SIZE] for i in range(0, len(encoded), KITTY_CHUNK_SIZE)]
+            for i, chunk in enumerate(chunks):
+                control = "f=100,a=T," if i == 0 else ""
+                more = 1 if i < len(chunks) - 1 else 0
+                sys.stdout.write(f"\033_G{control}m={more};{chunk}\033\\")
+            sys.stdout.write("\n")
+        
+        sys.stdout.flush()
         return True
-    except:
+    except Exception:
+        return False
+
+def display_image_with_imgcat(image_path):
+    """Display an image file with imgcat, which also handles tmux passthrough."""
+    if IMGCAT_PATH is None or "TMUX" not in os.environ:
+        return False
+    try:
+        result = subprocess.run([IMGCAT_PATH, str(image_path)], check=False, timeout=5)
+    except (OSError, subprocess.SubprocessError):
+        return False
+    return result.returncode == 0
+
+def display_image_in_terminal(image_path):
+    """Display an image file in the terminal if possible."""
+    if inline_image_protocol() is None:
+        return display_image_with_imgcat(image_path)
+    try:
+        return display_image_bytes(Path(image_path).read_bytes())
+    except OSError:
         return False
     
 def display_agent_graph(agent):
     """Generate and display a graph visualization of the agent."""
-    # Generate a temporary filename
+    # Filename used when the graph has to be written to disk
     graph_path = "temp_graph.png"
+    png = None
     
     try:
         # Zawsze najpierw próbuj użyć metody get_graph().draw_mermaid_png()
         if hasattr(agent, 'get_graph'):
             graph = agent.get_graph()
             if hasattr(graph, 'draw_mermaid_png'):
-                with open(graph_path, 'wb') as f:
-                    f.write(graph.draw_mermaid_png())
-                rprint(f"[bold blue]📊 Agent graph saved to {graph_path}[/bold blue]")
+                # Keep the PNG in memory; it is only written to disk if it can't be shown inline
+                png = graph.draw_mermaid_png()
             else:
                 rprint(f"[bold yellow]⚠️ Agent graph object doesn't support draw_mermaid_png[/bold yellow]")
                 # Fallback do starej metody
@@ -183,12 +339,22 @@ def display_agent_graph(agent):
         else:
             rprint(f"[bold yellow]⚠️ This agent type ({type(agent).__name__}) doesn't support graph visualization[/bold yellow]")
             return False
+        
+        # Try to display the image in the terminal
+        if png is not None:
+            displayed = display_image_bytes(png)
+            if not displayed:
+                with open(graph_path, 'wb') as f:
+                    f.write(png)
+                rprint(f"[bold blue]📊 Agent graph saved to {graph_path}[/bold blue]")
+                displayed = display_image_with_imgcat(graph_path)
+        else:
+            displayed = display_image_in_terminal(graph_path)
     except Exception as e:
         rprint(f"[bold red]❌ Error generating agent graph: {e}[/bold red]")
         return False
     
-    # Try to display the image in the terminal
-    if os.path.exists(graph_path) and display_image_in_terminal(graph_path):
+    if displayed:
         rprint("[bold green]✅ Graph displayed![/bold green]")
     else:
         rprint(f"[bold yellow]ℹ️ Unable to display image in terminal. You can view the graph by opening {graph_path}[/bold yellow]")
@@ -199,8 +365,10 @@ def initialize_core_agent():
     """Initialize the core agent and return it."""
     with console.status("[bold green]🔄 Initializing core agent...[/bold green]"):
         try:
-            # Initialize the agent
-            agent = generate_core_agent()
+            from agents_forge.core_agent.agent import get_core_agent
+            
+            # The core agent graph is compiled once per process and reused
+            agent = get_core_agent()
             return agent
         except Exception as e:
             rprint(f"[bold red]❌ Error initializing core agent: {e}[/bold red]")
@@ -208,9 +376,7 @@ def initialize_core_agent():
 
 def save_agent_config(config: Any, filename: str = "agent_config.json"):
     """Save an agent configuration to a file."""
-    # Create the agents directory if it doesn't exist
-    os.makedirs(AGENTS_DIR, exist_ok=True)
-    
+    # AGENTS_DIR is created once by setup() at startup
     # If filename doesn't have .json extension, add it
     if not filename.endswith('.json'):
         filename += '.json'
@@ -219,10 +385,8 @@ def save_agent_config(config: Any, filename: str = "agent_config.json"):
     file_path = AGENTS_DIR / filename
     
     try:
-        # Convert config to JSON and save to file with pretty formatting
-        config_dict = config.model_dump()
-        with open(file_path, 'w') as f:
-            json.dump(config_dict, f, indent=4)
+        # Serialize in pydantic-core and save to file with pretty formatting
+        file_path.write_text(config.model_dump_json(indent=4), encoding="utf-8")
         
         rprint(f"[bold green]✅ Agent configuration saved to {file_path}[/bold green]")
         return file_path
@@ -230,12 +394,26 @@ def save_agent_config(config: Any, filename: str = "agent_config.json"):
         rprint(f"[bold red]❌ Error saving agent configuration: {e}[/bold red]")
         return None
 
+def scan_saved_agents():
+    """Return (name, size, mtime) for each saved agent, sorted by name."""
+    # Get all JSON files in the agents directory; DirEntry caches its stat result
+    agents = []
+    try:
+        with os.scandir(AGENTS_DIR) as it:
+            for entry in it:
+                if entry.name.endswith('.json') and entry.is_file():
+                    stat = entry.stat()
+                    agents.append((entry.name[:-len('.json')], stat.st_size, stat.st_mtime))
+    except FileNotFoundError:
+        return []
+    agents.sort()
+    return agents
+
 def list_saved_agents():
     """List all saved agent configurations."""
-    # Get all JSON files in the agents directory
-    agent_files = list(AGENTS_DIR.glob('*.json'))
+    agents = scan_saved_agents()
     
-    if not agent_files:
+    if not agents:
         rprint("[bold yellow]ℹ️ No saved agents found.[/bold yellow]")
         return []
     
@@ -247,20 +425,14 @@ def list_saved_agents():
     table.add_column("Last Modified", style="yellow")
     
     # Add each agent to the table
-    for i, file_path in enumerate(agent_files, 1):
-        # Get file information
-        name = file_path.stem
-        size = f"{file_path.stat().st_size / 1024:.1f} KB"
-        modified = time.ctime(file_path.stat().st_mtime)
-        
-        # Add to table
-        table.add_row(str(i), name, size, modified)
+    for i, (name, size, mtime) in enumerate(agents, 1):
+        table.add_row(str(i), name, f"{size / 1024:.1f} KB", time.ctime(mtime))
     
     # Display the table
     console.print(table)
     
     # Return the list of agent names
-    return [file.stem for file in agent_files]
+    return [name for name, _, _ in agents]
 
 async def load_agent_from_file(filename: str):
     """Load an agent from a saved configuration file."""
@@ -276,18 +448,14 @@ async def load_agent_from_file(filename: str):
         rprint(f"[bold red]❌ Agent configuration file not found: {file_path}[/bold red]")
         return None
     
+    from agents_forge.agents_generation.generator import create_agent_from_config
+    
     try:
-        # Load the configuration from file
-        with open(file_path, 'r') as f:
-            config_json = f.read()
-        
-        # Parse the JSON into an AgentConfig object
-        agent_config = AgentConfig.model_validate_json(config_json)
-        
         # Create a loading message
-        with console.status(f"[bold green]🔄 Loading agent {agent_config.agent_name}...[/bold green]"):
-            # Generate the agent from the configuration
-            agent = generate_agent_from_config(agent_config)
+        with console.status(f"[bold green]🔄 Loading agent from {file_path.name}...[/bold green]"):
+            # Compiled agents are cached per file, so reloading an unchanged config is free;
+            # the config is parsed off the event loop and returned alongside the agent
+            agent, agent_config = await create_agent_from_config(file_path)
             
             rprint(f"[bold green]✅ Agent {agent_config.agent_name} loaded successfully![/bold green]")
             return agent
@@ -295,122 +463,224 @@ async def load_agent_from_file(filename: str):
         rprint(f"[bold red]❌ Error loading agent: {e}[/bold red]")
         return None
 
+# Matches the content of a message repr like "content='actual message content' ..."
+CONTENT_REPR_PATTERN = re.compile(r"""content=(['"])(.+?)\1""", re.DOTALL)
+
+def _parse_content_repr(text):
+    """Extract the content from a message repr like "content='actual message content' ..."."""
+    match = CONTENT_REPR_PATTERN.search(text)
+    return match.group(2) if match else None
+
+@singledispatch
 def extract_message_content(chunk):
     """Extract actual message content from a streaming chunk."""
-    # If it's a direct message chunk
-    if hasattr(chunk, "content") and chunk.content:
-        return chunk.content
-    
-    # Handle AIMessage objects directly
-    if hasattr(chunk, "__class__") and chunk.__class__.__name__ == "AIMessage":
-        if hasattr(chunk, "content"):
-            return chunk.content
-    
-    # If it's a node output with messages
-    if isinstance(chunk, dict):
-        # Check if there are any message nodes
-        for node_name, node_data in chunk.items():
-            if isinstance(node_data, dict) and "messages" in node_data:
-                messages = node_data.get("messages", [])
-                if messages:
-                    # Get the last message's content
-                    last_message = messages[-1]
-                    
-                    # Handle AIMessage objects in messages array
-                    if hasattr(last_message, "__class__") and last_message.__class__.__name__ == "AIMessage":
-                        if hasattr(last_message, "content"):
-                            return last_message.content
-                    
-                    # Handle regular objects with content attribute
-                    if hasattr(last_message, "content") and last_message.content:
-                        return last_message.content
-                    
-                    # Process string message format: "content='actual message content' additional_kwargs={} ..."
-                    if isinstance(last_message, str) and "content=" in last_message:
-                        try:
-                            # Extract content between the first set of quotes after content=
-                            content_start = last_message.find("content='") + 9  # Length of "content='"
-                            if content_start > 9:  # Make sure "content='" was found
-                                content_end = last_message.find("'", content_start)
-                                if content_end > content_start:
-                                    return last_message[content_start:content_end]
-                            
-                            # Try double quotes if single quotes didn't work
-                            content_start = last_message.find('content="') + 9
-                            if content_start > 9:
-                                content_end = last_message.find('"', content_start)
-                                if content_end > content_start:
-                                    return last_message[content_start:content_end]
-                        except:
-                            pass
-    
     # For other types of chunks, try to extract from common patterns
-    chunk_str = str(chunk)
-    if "content='" in chunk_str:
-        try:
-            # Extract content from a string like: content='message content here'
-            content_start = chunk_str.find("content='") + 9
-            if content_start > 9:
-                content_end = chunk_str.find("'", content_start)
-                if content_end > content_start:
-                    return chunk_str[content_start:content_end]
-        except:
-            pass
-    
+    return _parse_content_repr(str(chunk))
+
+@extract_message_content.register
+def _(chunk: str):
+    # String message format: "content='actual message content' additional_kwargs={} ..."
+    return _parse_content_repr(chunk) if "content=" in chunk else None
+
+@extract_message_content.register
+def _(chunk: dict):
+    # Node output with messages: use the last message of the first node that has content
+    for node_data in chunk.values():
+        if isinstance(node_data, dict):
+            messages = node_data.get("messages")
+            if messages:
+                content = extract_message_content(messages[-1])
+                if content:
+                    return content
     return None
 
-def should_display_content(chunk):
-    """Determine if a chunk contains message content that should be displayed."""
-    # If it's a message chunk directly
-    if hasattr(chunk, "content") and chunk.content:
-        return True
+def register_message_extractors():
+    """Register the LangChain message extractor once the message classes are loaded."""
+    from langchain_core.messages import BaseMessage
     
-    # Check if it's a node chunk with messages
-    if isinstance(chunk, dict):
-        for node_name, node_data in chunk.items():
-            if isinstance(node_data, dict) and "messages" in node_data:
-                return True
-    
-    return False
+    @extract_message_content.register(BaseMessage)
+    def _(chunk):
+        # Direct message chunk
+        return chunk.content
+
+# Prebuilt Rich text for streamed chunks, so each chunk skips markup parsing
+CHUNK_DIVIDER = Text("---CHUNK DIVIDER---\n", style="yellow")
+NEXT_STEP_LABEL = Text("Next step: ", style="bold magenta")
+
+def message_text(content):
+    """Build the displayable text for a message chunk."""
+    return Text.assemble(CHUNK_DIVIDER, (str(content), "green"))
+
+def next_step_text(next_step):
+    """Build the displayable text for a planned step."""
+    return Text.assemble(CHUNK_DIVIDER, NEXT_STEP_LABEL, str(next_step))
 
 def get_displayable_content(chunk):
     """Extract only the human-readable content from a chunk, skipping technical details."""
+    from langchain_core.messages import AIMessage
+    
     try:
         # Handle AIMessage objects directly
-        if hasattr(chunk, "__class__") and chunk.__class__.__name__ == "AIMessage":
-            if hasattr(chunk, "content"):
-                return f"[yellow]---CHUNK DIVIDER---[/yellow]\n[green]{safe_format(chunk.content)}[/green]"
-            return None
+        if isinstance(chunk, AIMessage):
+            return message_text(chunk.content)
         
         # Handle other types of content
         content = extract_message_content(chunk)
         if content:
             # Handle special case for "Next step: X" messages
             if isinstance(content, str) and content.startswith("Next step:"):
-                next_step = content.split(":", 1)[1].strip() if ":" in content else "unknown"
-                # Return formatted string for next step
-                return f"[yellow]---CHUNK DIVIDER---[/yellow]\n[bold magenta]Next step:[/bold magenta] {safe_format(next_step)}"
+                return next_step_text(content.split(":", 1)[1].strip())
             
             # Regular messages
-            return f"[yellow]---CHUNK DIVIDER---[/yellow]\n[green]{safe_format(content)}[/green]"
+            return message_text(content)
         
         # For the specific case where chunk has "planned_step" directly
-        if hasattr(chunk, "planned_step") and chunk.planned_step:
-            return f"[yellow]---CHUNK DIVIDER---[/yellow]\n[bold magenta]Next step:[/bold magenta] {safe_format(str(chunk.planned_step))}"
+        planned_step = getattr(chunk, "planned_step", None)
+        if planned_step:
+            return next_step_text(planned_step)
     except Exception as e:
         return f"[yellow]Error formatting content: {safe_format(str(e))}[/yellow]"
     
     return None
 
+def render_chunk(chunk):
+    """
+    Render a streamed chunk in a single pass.
+    
+    Returns the displayable content (or None) and the message content the chunk adds to
+    the response (None unless the chunk is itself a message).
+    """
+    from langchain_core.messages import BaseMessage
+    
+    if isinstance(chunk, BaseMessage):
+        return get_displayable_content(chunk), chunk.content or None
+    return get_displayable_content(chunk), None
+
+async def _consume_stream(agent, messages, config, response_parts, latest_values):
+    """Stream the agent's updates, displaying each chunk; returns the number of chunks received."""
+    chunk_count = 0
+    
+    # Stream the response. Every write goes through the one module console: in "updates"
+    # mode a chunk is a whole node result, so it is printed as soon as it arrives rather
+    # than held back in a batch.
+    try:
+        async for chunk in agent.astream(
+            {"messages": messages},
+            config,
+            stream_mode="updates"
+        ):
+            try:
+                chunk_count += 1
+                
+                # Track the newest value of each state key written by the nodes
+                if latest_values is not None and isinstance(chunk, dict):
+                    for updates in chunk.values():
+                        if isinstance(updates, dict):
+                            latest_values.update(updates)
+                
+                # Raw chunk details are serialized only when explicitly requested
+                if VERBOSE:
+                    display_chunk_info(chunk)
+                
+                # Get content for display and the message content to collect, in one pass
+                display_content, content_delta = render_chunk(chunk)
+                if display_content:
+                    console.print(display_content)
+                
+                # Still collect content for message history if it's a message
+                if content_delta:
+                    response_parts.append(content_delta)
+            except Exception as e:
+                console.print(f"[red]Error processing chunk: {safe_format(str(e))}[/red]")
+    except Exception as e:
+        console.print(f"[red]Error during streaming: {safe_format(str(e))}[/red]")
+    
+    return chunk_count
+
+async def stream_agent_response(agent, messages, config, latest_values=None):
+    """
+    Stream an agent's response to the given messages, displaying chunks as they arrive.
+    
+    If latest_values is a dict, every state update seen in the stream is merged into it,
+    so callers can read the latest state values without fetching the checkpoint again.
+    Ctrl-C while streaming cancels the response (closing the in-flight LLM request)
+    and returns to the prompt instead of exiting the CLI.
+    
+    Returns the accumulated message content, or an empty string if no message chunks were streamed.
+    """
+    response_parts = []
+    
+    # Initial message to indicate agent is responding
+    console.print("[bold green]🤖 Agent is thinking...[/bold green]\n[bold green]Agent:[/bold green]")
+    
+    streaming = asyncio.ensure_future(_consume_stream(agent, messages, config, response_parts, latest_values))
+    
+    # Route Ctrl-C to the stream while it runs; not available on Windows event loops
+    loop = asyncio.get_running_loop()
+    interrupted = []
+    previous_handler = signal.getsignal(signal.SIGINT)
+    try:
+        loop.add_signal_handler(signal.SIGINT, lambda: (interrupted.append(True), streaming.cancel()))
+        handler_installed = True
+    except (NotImplementedError, RuntimeError, ValueError):
+        handler_installed = False
+    
+    try:
+        chunk_count = await streaming
+    except asyncio.CancelledError:
+        # Cancelled from outside rather than by Ctrl-C: propagate
+        if not interrupted:
+            raise
+        console.print("\n[bold yellow]⏹ Response interrupted.[/bold yellow]\n")
+        return "".join(response_parts)
+    finally:
+        if handler_installed:
+            loop.remove_signal_handler(signal.SIGINT)
+            signal.signal(signal.SIGINT, previous_handler)
+    
+    # Final message to indicate streaming is complete
+    if chunk_count > 0:
+        console.print("\n[dim]--- END OF STREAMING ---[/dim]\n")
+    
+    # No streaming chunks received at all
+    if chunk_count == 0:
+        console.print("[bold yellow]⚠️ No streaming response received.")
+    
+    return "".join(response_parts)
+
+def _log_warm_up_failure(future):
+    """
+    Done callback for the client warm-up.
+    
+    A failure there (e.g. a missing API key) is reported by the first real call instead,
+    so it is only logged at debug level. The future is cancelled on Ctrl-C or shutdown.
+    """
+    if future.cancelled():
+        return
+    error = future.exception()
+    if error is not None:
+        logger.debug("LLM client warm-up failed: %s", error)
+
 async def chat_with_core_agent():
     """Start a conversation with the core agent."""
+    from langchain_core.messages import HumanMessage
+    from agents_forge.agents_generation.generator import generate_agent_from_config
+    from agents_forge.core_agent.utils.nodes import warm_up_clients
+    
+    # Build the LLM clients in a worker thread while the graph is compiled and rendered and
+    # the user types the first message
+    warm_up = asyncio.get_running_loop().run_in_executor(None, warm_up_clients)
+    warm_up.add_done_callback(_log_warm_up_failure)
+    
     # Initialize the core agent
     rprint("[bold blue]🤖 Initializing Core Agent...[/bold blue]")
     agent = initialize_core_agent()
     display_agent_graph(agent)
     
+    # Conversation history lives in the agent's checkpointer; each turn sends only the new message
     config = {"configurable": {"thread_id": DEFAULT_THREAD_ID}}
-    messages = []
+    # State values written during this session, filled in while streaming
+    latest_values = {}
     
     rprint("[bold green]✅ Agent initialized successfully![/bold green]")
     rprint(Panel.fit(
@@ -426,33 +696,33 @@ async def chat_with_core_agent():
     while True:
         # Get user input
         user_input = Prompt.ask("[bold blue]You[/bold blue]")
+        # Lowercased once for the command checks below
+        command = user_input.lower()
         
-        if user_input.lower() == "exit":
+        if command == "exit":
             rprint("[bold yellow]👋 Exiting conversation.[/bold yellow]")
             break
         
         # Handle graph command
-        if user_input.lower() == "graph":
+        if command == "graph":
             display_agent_graph(agent)
             continue
         
-        # Add user message to the list
-        messages.append(HumanMessage(content=user_input))
-        
         # Handle 'save_config' command
-        if user_input.lower() == "save_config":
+        if command == "save_config":
             try:
-                # Check if agent_config exists in the state
-                state_snapshot = agent.get_state(config)
-                agent_config = state_snapshot.values.get('agent_config')
+                # Check if agent_config exists in the state; the checkpoint is only read when
+                # this session's stream hasn't produced one (e.g. a thread from an earlier chat)
+                agent_config = latest_values.get('agent_config') or agent.get_state(config).values.get('agent_config')
                 
                 if agent_config:
                     # Always ask for custom name first
                     custom_name = Prompt.ask("[bold blue]Enter a name for this agent[/bold blue]")
                     
-                    # Save the configuration with a clear status
+                    # Save the configuration with a clear status; the write runs in a worker thread
+                    # so the event loop isn't blocked on disk I/O
                     with console.status("[bold green]🔄 Saving agent with custom name...[/bold green]") as status:
-                        save_agent_config(agent_config, custom_name)
+                        await asyncio.to_thread(save_agent_config, agent_config, custom_name)
                     
                     # Display agent information
                     rprint(Panel.fit(
@@ -478,77 +748,17 @@ async def chat_with_core_agent():
                 rprint(f"[bold red]❌ Error generating agent: {e}[/bold red]")
         else:
             # Process normal message with streaming
-            rprint("[bold green]🤖 Agent is thinking...[/bold green]")
-            
             try:
-                # Use streaming with changes output - just display raw chunks
-                response_content = ""
-                chunk_count = 0
-                
-                # Initial message to indicate agent is responding
-                rprint("[bold green]Agent:[/bold green]")
-                
-                # Stream the response
-                final_message = None
-                try:
-                    for chunk in agent.stream(
-                        {"messages": messages}, 
-                        config,
-                        stream_mode="updates"
-                    ):
-                        try:
-                            chunk_count += 1
-                            
-                            # Obsługa bezpośrednich obiektów AIMessage z innym wzorcem
-                            if hasattr(chunk, "__class__") and chunk.__class__.__name__ == "AIMessage":
-                                if hasattr(chunk, "content"):
-                                    # Bezpośrednio wyświetl zawartość AIMessage
-                                    rprint(f"[yellow]---CHUNK DIVIDER---[/yellow]\n[green]{safe_format(chunk.content)}[/green]")
-                                    # Zapisz do final_message
-                                    final_message = chunk.content
-                                    # Dodaj do całkowitej zawartości odpowiedzi
-                                    response_content += chunk.content
-                                    continue
-                            
-                            # Standardowa obsługa dla innych typów chunków    
-                            # Get content for display
-                            display_content = get_displayable_content(chunk)
-                            if display_content:
-                                # Use rprint instead of print to properly render Rich formatting tags
-                                rprint(display_content)
-                            
-                            # Extract message content from the chunk for final message
-                            message_content = extract_message_content(chunk)
-                            if message_content:
-                                final_message = message_content
-                            
-                            # Still collect content for message history if it's a message
-                            if hasattr(chunk, "content") and chunk.content:
-                                response_content += chunk.content
-                        except Exception as e:
-                            rprint(f"[red]Error processing chunk: {safe_format(str(e))}[/red]")
-                except Exception as e:
-                    rprint(f"[red]Error during streaming: {safe_format(str(e))}[/red]")
-                
-                # Final message to indicate streaming is complete
-                if chunk_count > 0:
-                    rprint("\n[dim]--- END OF STREAMING ---[/dim]\n")
-                
-                # No streaming chunks received at all
-                if chunk_count == 0:
-                    rprint("[bold yellow]⚠️ No streaming response received.")
-                
-                # Save to message history if we got actual content
-                if response_content:
-                    ai_message = AIMessage(content=response_content)
-                    messages.append(ai_message)
+                await stream_agent_response(agent, [HumanMessage(content=user_input)], config, latest_values)
             except Exception as e:
                 rprint(f"Error getting agent response: {str(e)}")
 
 async def test_agent(agent):
     """Test a generated or loaded agent."""
-    # Initialize list to store conversation history
-    messages = []
+    from langchain_core.messages import HumanMessage
+    
+    # Conversation history lives in the agent's checkpointer, one thread per test session
+    config = {"configurable": {"thread_id": f"{DEFAULT_THREAD_ID}_{uuid.uuid4().hex}"}}
     
     rprint(Panel.fit(
         "[bold]Test Agent[/bold]\n\n"
@@ -562,86 +772,24 @@ async def test_agent(agent):
     while True:
         # Get user input
         user_input = Prompt.ask("[bold blue]You[/bold blue]")
+        # Lowercased once for the command checks below
+        command = user_input.lower()
         
-        if user_input.lower() == "exit":
+        if command == "exit":
             rprint("[bold yellow]👋 Exiting test.[/bold yellow]")
             break
         
         # Handle graph command
-        if user_input.lower() == "graph":
+        if command == "graph":
             display_agent_graph(agent)
             continue
         
         # Create message
         user_message = HumanMessage(content=user_input)
-        # Add to history
-        messages.append(user_message)
-        
-        # Process the message with streaming
-        rprint("[bold green]🤖 Agent is thinking...[/bold green]")
         
+        # Process the message with streaming; earlier turns are restored from the checkpointer
         try:
-            # Use streaming with changes output - just display raw chunks
-            response_content = ""
-            chunk_count = 0
-            
-            # Initial message to indicate agent is responding
-            rprint("[bold green]Agent:[/bold green]")
-            
-            # Stream the response
-            final_message = None
-            try:
-                # Use full message history instead of just the last message
-                for chunk in agent.stream(
-                    {"messages": messages},
-                    stream_mode="updates"
-                ):
-                    try:
-                        chunk_count += 1
-                        
-                        # Obsługa bezpośrednich obiektów AIMessage z innym wzorcem
-                        if hasattr(chunk, "__class__") and chunk.__class__.__name__ == "AIMessage":
-                            if hasattr(chunk, "content"):
-                                # Bezpośrednio wyświetl zawartość AIMessage
-                                rprint(f"[yellow]---CHUNK DIVIDER---[/yellow]\n[green]{safe_format(chunk.content)}[/green]")
-                                # Zapisz do final_message
-                                final_message = chunk.content
-                                # Dodaj do całkowitej zawartości odpowiedzi
-                                response_content += chunk.content
-                                continue
-                        
-                        # Standardowa obsługa dla innych typów chunków    
-                        # Get content for display
-                        display_content = get_displayable_content(chunk)
-                        if display_content:
-                            # Use rprint instead of print to properly render Rich formatting tags
-                            rprint(display_content)
-                        
-                        # Extract message content from the chunk for final message
-                        message_content = extract_message_content(chunk)
-                        if message_content:
-                            final_message = message_content
-                        
-                        # Still collect content for message history if it's a message
-                        if hasattr(chunk, "content") and chunk.content:
-                            response_content += chunk.content
-                    except Exception as e:
-                        rprint(f"[red]Error processing chunk: {safe_format(str(e))}[/red]")
-            except Exception as e:
-                rprint(f"[red]Error during streaming: {safe_format(str(e))}[/red]")
-            
-            # Final message to indicate streaming is complete
-            if chunk_count > 0:
-                rprint("\n[dim]--- END OF STREAMING ---[/dim]\n")
-            
-            # No streaming chunks received at all
-            if chunk_count == 0:
-                rprint("[bold yellow]⚠️ No streaming response received.")
-            
-            # Save to message history if we got actual content
-            if response_content:
-                ai_message = AIMessage(content=response_content)
-                messages.append(ai_message)
+            await stream_agent_response(agent, [user_message], config)
         except Exception as e:
             rprint(f"Error getting agent response: {str(e)}")
 
@@ -653,77 +801,43 @@ async def test_saved_agent():
         rprint("[bold red]❌ No saved agents found.[/bold red]")
         return
     
-    agent_idx = Prompt.ask(
-        "[bold blue]Enter the ID of the agent you want to test[/bold blue]", 
-        choices=[str(i) for i in range(1, len(agents) + 1)]
-    )
+    # Ask until the ID is in range
+    while True:
+        agent_idx = IntPrompt.ask("[bold blue]Enter the ID of the agent you want to test[/bold blue]")
+        if 1 <= agent_idx <= len(agents):
+            break
+        rprint(f"[bold red]Please enter an ID between 1 and {len(agents)}[/bold red]")
     
-    agent_name = agents[int(agent_idx) - 1]
+    agent_name = agents[agent_idx - 1]
     agent = await load_agent_from_file(agent_name)
     
     if agent:
         display_agent_graph(agent)
         await test_agent(agent)
 
+VERBOSE_OPTION = typer.Option(False, "--verbose", "-v", help="Show raw chunk details while streaming")
+
 @app.command()
-def chat():
+def chat(verbose: bool = VERBOSE_OPTION):
     """Start a conversation with the core agent."""
-    asyncio.run(chat_with_core_agent())
+    global VERBOSE
+    VERBOSE = verbose
+    load_agent_modules()
+    run_async(chat_with_core_agent())
 
 @app.command()
-def test():
+def test(verbose: bool = VERBOSE_OPTION):
     """Load and test a saved agent."""
-    asyncio.run(test_saved_agent())
+    global VERBOSE
+    VERBOSE = verbose
+    load_agent_modules()
+    run_async(test_saved_agent())
 
 @app.command(name="list")
 def list_agents():
     """List all saved agent configurations."""
     list_saved_agents()
 
-def format_chunk(chunk):
-    """Format chunk data for better readability based on its content."""
-    # Get chunk node name if it exists (for better context)
-    node_name = None
-    try:
-        if isinstance(chunk, dict) and len(chunk) == 1:
-            # Używamy iter() i next() zamiast list() na keys()
-            node_name = next(iter(chunk.keys()))
-    except Exception:
-        # Ignorujemy błędy przy próbie uzyskania nazwy node'a
-        pass
-    
-    try:
-        if isinstance(chunk, dict):
-            # Dictionary format for normal agent output
-            if node_name:
-                return f"[bold yellow]Node: {safe_format(node_name)}[/bold yellow]\n{json.dumps(chunk[node_name], indent=2, default=str)}"
-            else:
-                return json.dumps(chunk, indent=2, default=str)
-        elif hasattr(chunk, "content") and chunk.content:
-            # Simple message chunk
-            return f"[green]Message: {safe_format(chunk.content)}[/green]"
-        else:
-            # Try to identify if it's a core agent or custom agent
-            if hasattr(chunk, "planned_step") or (hasattr(chunk, "__dict__") and any(isinstance(k, Enum) for k in chunk.__dict__)):
-                # Core agent with schema output
-                chunk_data = safe_format(str(chunk))
-                
-                # Simplify formatting to improve compatibility with different terminals
-                if "planned_step" in chunk_data:
-                    chunk_data = chunk_data.replace("NextStep.", "NEXT STEP: ")
-                
-                if "messages" in chunk_data:
-                    chunk_data = chunk_data.replace("AIMessage(content=", "AI: ")
-                    chunk_data = chunk_data.replace("HumanMessage(content=", "Human: ")
-                
-                return chunk_data
-            else:
-                # Default fallback
-                return safe_format(str(chunk))
-    except Exception as e:
-        # W przypadku jakiegokolwiek błędu, po prostu zwróć surowy string
-        return f"Raw chunk data: {safe_format(str(chunk))}"
-
 def main():
     """Run the main application."""
     # Print welcome message with simpler formatting
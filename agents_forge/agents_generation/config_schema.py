@@ -1,5 +1,6 @@
+import sys
 from typing import List, Dict, Any, Literal, Optional
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 
 class NodeConfig(BaseModel):
     """
@@ -8,12 +9,20 @@ class NodeConfig(BaseModel):
     A node represents a processing step in the agent's workflow. Each node has a unique
     identifier, a type that determines its behavior, and various configuration options.
     """
+    model_config = ConfigDict(frozen=True, extra='ignore')
+    
     id: str = Field(description="Unique identifier for this node")
     type: str = Field(description="Type of node (predefined or custom)")
     objective: str = Field(description="Main objective of this node - what it should accomplish")
     model_name: str = Field( description="Name of the model to use, i prefer gpt-4o-mini")
     temperature: float = Field(description="Temperature parameter for model generation")
     
+    @field_validator("id")
+    @classmethod
+    def intern_id(cls, value: str) -> str:
+        """Intern node ids so graph lookups on them compare by identity."""
+        return sys.intern(value)
+    
 class EdgeConfig(BaseModel):
     """
     Configuration for an edge in the agent graph.
@@ -21,9 +30,17 @@ class EdgeConfig(BaseModel):
     Edges connect nodes to define the flow of the agent's processing. Each edge has a
     source node and a target node, defining the direction of the flow.
     """
+    model_config = ConfigDict(frozen=True, extra='ignore')
+    
     source: str = Field(description="Source node ID")
     target: str = Field(description="Target node ID")
     
+    @field_validator("source", "target")
+    @classmethod
+    def intern_node_id(cls, value: str) -> str:
+        """Intern endpoint ids so they share storage with the node ids they reference."""
+        return sys.intern(value)
+    
     
 class AgentConfig(BaseModel):
     """
@@ -32,6 +49,8 @@ class AgentConfig(BaseModel):
     This class defines the complete structure of an agent, including its nodes,
     edges, and metadata.
     """
+    model_config = ConfigDict(frozen=True, extra='ignore')
+    
     agent_name: str = Field(description="Name of the agent")
     description: str = Field(description="Description of what this agent does")
     nodes: List[NodeConfig] = Field(description="List of nodes in the agent graph")
@@ -1,14 +1,60 @@
 import json
-import importlib
-from typing import Dict, Any, Optional
+import asyncio
+import hashlib
+import os
+from functools import lru_cache, partial
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple
 from langgraph.graph import StateGraph, END, START
 from agents_forge.agents_generation.state import AgentsGenerationState
 from agents_forge.agents_generation.node_types import create_node
 from langgraph.checkpoint.memory import MemorySaver
-from pydantic import BaseModel, create_model, Field
+from langgraph.cache.memory import InMemoryCache
+from langgraph.types import CachePolicy
 from agents_forge.agents_generation.config_schema import AgentConfig
 
-def generate_agent_from_config(config_from_ai: AgentConfig):
+# Checkpointer shared by generated agents; conversation state is kept per thread_id
+memory = MemorySaver()
+
+# Process-wide node cache shared by generated agents. Only deterministic nodes use it
+# (see _cache_policy_for), and entries expire after NODE_CACHE_TTL seconds
+node_cache = InMemoryCache()
+NODE_CACHE_TTL = 600
+
+def _node_cache_key(node_config_json: str, state: AgentsGenerationState) -> str:
+    """
+    Build a node cache key from the node's config and the parts of the state that nodes read.
+    
+    The cache is shared by every generated agent and LangGraph only namespaces entries by
+    node name, so the node config (objective, model, temperature) is part of the key; two
+    agents with a same-named node must not reuse each other's output.
+    """
+    payload = {
+        "node": node_config_json,
+        "instructions": state.get("agent_instructions", ""),
+        "messages": [(message.type, message.content) for message in state["messages"]],
+    }
+    return hashlib.blake2b(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+def _cache_policy_for(node_config) -> Optional[CachePolicy]:
+    """
+    Return the cache policy for a node, or None if its output must not be reused.
+    
+    Web search results are live and sampled LLM output varies between calls, so only
+    llm nodes running at temperature 0 are cached.
+    """
+    if node_config.type == "llm" and node_config.temperature == 0:
+        return CachePolicy(key_func=partial(_node_cache_key, node_config.model_dump_json()), ttl=NODE_CACHE_TTL)
+    return None
+
+# Config names of the special graph endpoints
+SPECIAL_NODES = {"START": START, "END": END}
+
+# Compiled graphs keyed by (config JSON, checkpointer, cache), oldest first
+MAX_GENERATED_AGENTS = 32
+_generated_agents: Dict[Tuple[str, Any, Any], Any] = {}
+
+def generate_agent_from_config(config_from_ai: AgentConfig, checkpointer=memory, cache=node_cache):
     """
     Generate an agent from a JSON configuration file.
     
@@ -17,6 +63,9 @@ def generate_agent_from_config(config_from_ai: AgentConfig):
     
     Args:
         config_path: Path to the JSON configuration file
+        checkpointer: LangGraph checkpointer that persists state between turns. Callers
+            must pass config={"configurable": {"thread_id": ...}} when invoking the agent
+        cache: LangGraph cache used to skip nodes that already ran on an identical state
         
     Returns:
         A compiled LangGraph agent ready to be executed
@@ -26,11 +75,25 @@ def generate_agent_from_config(config_from_ai: AgentConfig):
         json.JSONDecodeError: If the configuration file contains invalid JSON
         ValidationError: If the configuration doesn't match the expected schema
     """
-    # Load the configuration
-
-    # Validate the configuration using Pydantic
-    config = AgentConfig.model_validate(config_from_ai)
+    # Validate the configuration using Pydantic; AgentConfig instances are frozen and
+    # already validated, so they are used as-is
+    if isinstance(config_from_ai, AgentConfig):
+        config = config_from_ai
+    else:
+        config = AgentConfig.model_validate(config_from_ai)
+    
+    # Identical configs share one compiled graph; conversation state is kept per thread_id
+    key = (config.model_dump_json(), checkpointer, cache)
+    compiled_agent = _generated_agents.get(key)
+    if compiled_agent is None:
+        if len(_generated_agents) >= MAX_GENERATED_AGENTS:
+            del _generated_agents[next(iter(_generated_agents))]
+        compiled_agent = _generated_agents[key] = _build_agent(config, checkpointer, cache)
     
+    return compiled_agent
+
+def _build_agent(config: AgentConfig, checkpointer, cache):
+    """Build and compile the StateGraph described by a validated config."""
     # Initialize state graph
     workflow = StateGraph(AgentsGenerationState)
     
@@ -44,22 +107,93 @@ def generate_agent_from_config(config_from_ai: AgentConfig):
         node_function = create_node(node_type, node_config)
         
         # Add the node to the graph
-        workflow.add_node(node_id, node_function)
+        workflow.add_node(node_id, node_function, cache_policy=_cache_policy_for(node_config))
     
-    # Add edges
+    # Add edges, mapping the special START and END names
     for edge_config in config.edges:
-        source = edge_config.source
-        target = edge_config.target
-        
-        # Handle special cases for START and END
-        if source == "START":
-            source = START
-        if target == "END":
-            target = END
+        source = SPECIAL_NODES.get(edge_config.source, edge_config.source)
+        target = SPECIAL_NODES.get(edge_config.target, edge_config.target)
         
         workflow.add_edge(source, target)
     
     # Compile the graph
-    compiled_agent = workflow.compile()
+    return workflow.compile(checkpointer=checkpointer, cache=cache)
+
+
+@lru_cache(maxsize=64)
+def _load_config_cached(path: str, mtime_ns: int) -> AgentConfig:
+    """Read and validate a config file; cached per (path, mtime) pair."""
+    # Validate the raw bytes directly; pydantic-core parses JSON without a Python dict round-trip
+    return AgentConfig.model_validate_json(Path(path).read_bytes())
+
+def load_agent_config(config_path) -> AgentConfig:
+    """
+    Load and validate an agent configuration file.
     
-    return compiled_agent
+    The parsed configuration is cached until the file's modification time changes.
+    The returned object is shared between callers and should be treated as read-only.
+    
+    Args:
+        config_path: Path to the JSON configuration file
+        
+    Returns:
+        The validated AgentConfig
+    """
+    path = os.path.abspath(config_path)
+    return _load_config_cached(path, os.stat(path).st_mtime_ns)
+
+# (compiled agent, parsed config) pairs keyed by (absolute config path, mtime in ns)
+_compiled_agents: Dict[Tuple[str, int], Tuple[Any, AgentConfig]] = {}
+_compile_locks: Dict[Tuple[str, int], asyncio.Lock] = {}
+
+async def create_agent_from_config(config_path):
+    """
+    Load an agent configuration file and return the compiled agent with its configuration.
+    
+    Compiled agents are memoized by absolute path and modification time, so an
+    unchanged file is parsed and compiled only once. Editing the file invalidates
+    the cached entry.
+    
+    Args:
+        config_path: Path to the JSON configuration file
+        
+    Returns:
+        A (agent, config) tuple: the compiled LangGraph agent ready to be executed and
+        the validated AgentConfig it was built from
+        
+    Raises:
+        FileNotFoundError: If the configuration file doesn't exist
+        ValidationError: If the configuration doesn't match the expected schema
+    """
+    path = os.path.abspath(config_path)
+    key = (path, os.stat(path).st_mtime_ns)
+    
+    entry = _compiled_agents.get(key)
+    if entry is not None:
+        return entry
+    
+    # One lock per key so concurrent callers don't compile the same config twice
+    lock = _compile_locks.get(key)
+    if lock is None:
+        lock = _compile_locks[key] = asyncio.Lock()
+    async with lock:
+        entry = _compiled_agents.get(key)
+        if entry is None:
+            # Read and parse off the event loop so other coroutines keep running
+            config = await asyncio.to_thread(_load_config_cached, *key)
+            entry = (generate_agent_from_config(config), config)
+            
+            # Drop entries for older versions of the same file
+            for stale_key in [k for k in _compiled_agents if k[0] == path]:
+                del _compiled_agents[stale_key]
+                _compile_locks.pop(stale_key, None)
+            _compiled_agents[key] = entry
+    
+    return entry
+
+def clear_compiled_agents():
+    """Clear the compiled agent and parsed config caches."""
+    _compiled_agents.clear()
+    _generated_agents.clear()
+    _load_config_cached.cache_clear()
+    _compile_locks.clear()
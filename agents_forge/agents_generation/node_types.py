@@ -1,20 +1,127 @@
 from enum import Enum
-from typing import Dict, Any, Callable, List, Optional
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, Any, Callable, List, Optional
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
-from langchain_openai import ChatOpenAI
 from agents_forge.agents_generation.state import AgentsGenerationState
 from agents_forge.agents_generation.config_schema import NodeConfig
 from pydantic import BaseModel, Field
-from langchain_community.tools.tavily_search import TavilySearchResults
+import importlib.util
 import json
 import logging
 
+# The OpenAI client and the Tavily tool are imported on first use, so loading this module
+# (and graphs that use only some node types) doesn't pull in both dependency trees
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI
+
 # Configure logger
 logger = logging.getLogger(__name__)
 
 # Limit messages to last N
 MAX_MESSAGES = 4
 
+# Constant system prompt for the search query generation in web search nodes
+SEARCH_INSTRUCTIONS = SystemMessage(content="""
+            You will be given a conversation between an analyst and an expert. 
+            Your goal is to generate a well-structured query for use in retrieval and / or web-search related to the conversation.     
+            First, analyze the full conversation.
+            Convert this final question into a well-structured web search query""")
+
+@lru_cache(maxsize=1)
+def get_http_async_client():
+    """
+    Return the HTTP client shared by all chat model clients.
+    
+    One pool for every model keeps connections to the API alive across nodes and models;
+    HTTP/2 is used when the h2 package is installed so concurrent calls share a connection.
+    """
+    import httpx
+    
+    return httpx.AsyncClient(
+        http2=importlib.util.find_spec("h2") is not None,
+        timeout=60,
+        limits=httpx.Limits(max_keepalive_connections=50, max_connections=100),
+    )
+
+@lru_cache(maxsize=32)
+def get_llm(model_name: str, temperature: float) -> "ChatOpenAI":
+    """
+    Return a shared chat model client for the given settings.
+    
+    Clients are reused across node calls so each step skips client construction and
+    keeps the HTTP connection pool of the underlying OpenAI client.
+    
+    Args:
+        model_name: Name of the model to use
+        temperature: Temperature parameter for model generation
+        
+    Returns:
+        A ChatOpenAI client shared by all callers with the same settings
+    """
+    from langchain_openai import ChatOpenAI
+    
+    return ChatOpenAI(model=model_name, temperature=temperature, http_async_client=get_http_async_client())
+
+@lru_cache(maxsize=32)
+def get_json_llm(model_name: str, temperature: float, schema: type):
+    """
+    Return a shared chat model client constrained to reply with JSON matching a schema.
+    
+    The reply is left as a raw message; use parse_json_reply (or the schema's
+    model_validate_json) to turn it into a schema instance.
+    
+    Args:
+        model_name: Name of the model to use
+        temperature: Temperature parameter for model generation
+        schema: Pydantic model describing the reply
+        
+    Returns:
+        A runnable that returns an AIMessage whose content is the JSON reply
+    """
+    response_format = {
+        "type": "json_schema",
+        "json_schema": {"name": schema.__name__, "schema": schema.model_json_schema()},
+    }
+    return get_llm(model_name, temperature).bind(response_format=response_format)
+
+@lru_cache(maxsize=32)
+def get_tool_llm(model_name: str, temperature: float, schema: type):
+    """
+    Return a shared chat model client that must answer by calling a tool shaped like a schema.
+    
+    Function calling skips the constrained-decoding grammar that json_schema output builds
+    for the schema, which keeps latency down for larger schemas.
+    
+    Args:
+        model_name: Name of the model to use
+        temperature: Temperature parameter for model generation
+        schema: Pydantic model describing the tool arguments
+        
+    Returns:
+        A runnable that returns an AIMessage with a single call to the schema's tool
+    """
+    return get_llm(model_name, temperature).bind_tools([schema], tool_choice=schema.__name__)
+
+def tool_call_arguments(message: AIMessage) -> Optional[Dict[str, Any]]:
+    """Return the parsed arguments of the first tool call in a get_tool_llm reply, or None if it made none."""
+    if not message.tool_calls:
+        return None
+    return message.tool_calls[0]["args"]
+
+def parse_json_reply(schema: type, message: AIMessage):
+    """
+    Build a schema instance from a JSON reply returned by a get_json_llm client.
+    
+    The reply is parsed and validated in one pass by pydantic-core. Structured output
+    narrows what the model can send but doesn't guarantee it, and callers such as the
+    core agent's router rely on validated fields (e.g. a real NextStep value).
+    """
+    return schema.model_validate_json(message.content)
+
+class SearchQuery(BaseModel):
+    """Search query generated by the web search node."""
+    search_query: str = Field(None, description="Search query for retrieval.")
+
 class NodeType(str, Enum):
     """Predefined node types for the AgentForge system."""
     LLM = "llm"                     # Basic LLM call with messages
@@ -34,23 +141,26 @@ def create_llm_node(config: NodeConfig) -> Callable:
     temperature = config.temperature if hasattr(config, 'temperature') else 0.3
     system_prompt = config.objective
     
-    def llm_node(state: AgentsGenerationState) -> AgentsGenerationState:
-        llm = ChatOpenAI(model=model_name, temperature=temperature)
+    # Built once so every call sends an identical, cacheable prompt prefix
+    system_message = SystemMessage(content=system_prompt) if system_prompt else None
+    
+    async def llm_node(state: AgentsGenerationState) -> AgentsGenerationState:
+        llm = get_llm(model_name, temperature)
         
-        logger.info(f"[{config.id}] querying LLM with {len(state['messages'])} messages")
-        if state['messages']:
-            logger.info(f"[{config.id}] last message: {state['messages'][-1].content[:100]}...")
+        logger.info("[%s] querying LLM with %d messages", config.id, len(state['messages']))
+        if state['messages'] and logger.isEnabledFor(logging.INFO):
+            logger.info("[%s] last message: %s...", config.id, state['messages'][-1].content[:100])
         
         # Limit messages to last MAX_MESSAGES
         limited_messages = state['messages'][-MAX_MESSAGES:] if len(state['messages']) > MAX_MESSAGES else state['messages']
         
         # Add system prompt if provided
-        messages_with_system = [SystemMessage(content=system_prompt)] + limited_messages if system_prompt else limited_messages
+        messages_with_system = [system_message] + limited_messages if system_message else limited_messages
         
         # Call LLM
-        logger.info(f"[{config.id}] sending request to model {model_name}")
-        response = llm.invoke(messages_with_system)
-        logger.info(f"[{config.id}] received response from LLM")
+        logger.info("[%s] sending request to model %s", config.id, model_name)
+        response = await llm.ainvoke(messages_with_system)
+        logger.info("[%s] received response from LLM", config.id)
         
         # Return updated state
         return {"messages": [AIMessage(content=response.content)]}
@@ -67,36 +177,32 @@ def create_web_search_node(config: NodeConfig) -> Callable:
     Returns:
         A callable function that represents the node in the agent graph
     """
-    class SearchQuery(BaseModel):
-        search_query: str = Field(None, description="Search query for retrieval.")
-        
-    structured_llm = ChatOpenAI(model=config.model_name, temperature=config.temperature).with_structured_output(SearchQuery)
+    from langchain_community.tools.tavily_search import TavilySearchResults
     
+    query_llm = get_json_llm(config.model_name, config.temperature, SearchQuery)
     
-    def web_search_node(state: AgentsGenerationState) -> AgentsGenerationState:
-        search_instructions = SystemMessage(content=f"""
-            You will be given a conversation between an analyst and an expert. 
-            Your goal is to generate a well-structured query for use in retrieval and / or web-search related to the conversation.     
-            First, analyze the full conversation.
-            Convert this final question into a well-structured web search query""")
-
-        search_query = structured_llm.invoke([search_instructions]+state['messages'])
+    # Search tool is created once per node and reused by every call
+    tavily_search = TavilySearchResults(max_results=3)
+    
+    async def web_search_node(state: AgentsGenerationState) -> AgentsGenerationState:
+        search_query = parse_json_reply(SearchQuery, await query_llm.ainvoke([SEARCH_INSTRUCTIONS] + state['messages']))
         
-        logger.info(f"[{config.id}] performing web search with query: {search_query}")
+        logger.info("[%s] performing web search with query: %s", config.id, search_query)
          # Search
-        tavily_search = TavilySearchResults(max_results=3)
+        search_results = await tavily_search.ainvoke(search_query.search_query)
         
-        search_results = tavily_search.invoke(search_query.search_query)
+        # Nothing to report; leave the conversation unchanged
+        if not search_results:
+            logger.info("[%s] web search returned no results", config.id)
+            return {"messages": []}
         
         formatted_search_results = "\n\n---\n\n".join(
-            [
-                f'<Document href="{doc["url"]}"/>\n{doc["content"]}\n</Document>'
-                for doc in search_results
-            ]
+            '<Document href="%s"/>\n%s\n</Document>' % (doc["url"], doc["content"])
+            for doc in search_results
         )
         
         # Create response message
-        response_message = AIMessage(content=f"Found the following information: {formatted_search_results}")
+        response_message = AIMessage(content="Found the following information: " + formatted_search_results)
         
         # Return updated state with search results
         return {"messages": [response_message]}
@@ -119,12 +225,12 @@ def create_node(node_type: str, config: Dict[str, Any]) -> Callable:
         ValueError: If the node type is not recognized
     """
     
-    logger.info(f"Creating node: {config.id} of type {config.type}")
+    logger.info("Creating node: %s of type %s", config.id, config.type)
     
     if node_type == NodeType.LLM:
         return create_llm_node(config)
     elif node_type == NodeType.WEB_SEARCH:
         return create_web_search_node(config)
     else:
-        logger.error(f"Unknown node type: {node_type}")
+        logger.error("Unknown node type: %s", node_type)
         raise ValueError(f"Unknown node type: {node_type}. Supported types: {[t.value for t in NodeType]}") 
\ No newline at end of file
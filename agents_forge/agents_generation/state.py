@@ -1,11 +1,38 @@
-from typing import List, Dict, Any, Annotated
-from pydantic import BaseModel, Field
-from langgraph.graph import MessagesState
+from typing import Annotated, List
+from typing_extensions import TypedDict
 from langchain_core.messages import AnyMessage
 from langgraph.graph.message import add_messages
 
+# Maximum number of messages kept in the conversation history
+MAX_HISTORY_MESSAGES = 20
 
-class AgentsGenerationState(MessagesState):
+
+def _last(_: str, new: str) -> str:
+    """Reducer that keeps the most recent value."""
+    return new
+
+
+def bounded_add_messages(left: List[AnyMessage], right: List[AnyMessage]) -> List[AnyMessage]:
+    """
+    Merge messages like add_messages, keeping only a sliding window of the history.
+    
+    Leading system messages are always kept; the rest of the window is filled with the
+    most recent messages.
+    """
+    merged = add_messages(left, right)
+    if len(merged) <= MAX_HISTORY_MESSAGES:
+        return merged
+    
+    head = []
+    for message in merged:
+        if message.type != "system" or len(head) == MAX_HISTORY_MESSAGES - 1:
+            break
+        head.append(message)
+    
+    return head + merged[-(MAX_HISTORY_MESSAGES - len(head)):]
+
+
+class AgentsGenerationState(TypedDict):
     """State class for AgentForge agent."""
-    agent_instructions: str = Field(description="Instructions for the agent")
-    
\ No newline at end of file
+    messages: Annotated[List[AnyMessage], bounded_add_messages]
+    agent_instructions: Annotated[str, _last]
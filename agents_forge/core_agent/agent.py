@@ -1,6 +1,6 @@
 from langgraph.graph import StateGraph, END, START
 from agents_forge.core_agent.utils.state import AgentCreatorState
-from agents_forge.core_agent.utils.nodes import step_planner, update_blueprint, ask_followup, generate_agent, NextStep, route_to_step
+from agents_forge.core_agent.utils.nodes import step_planner, update_blueprint, ask_followup, generate_agent, NextStep, route_to_step, route_from_start, summarize_history
 from langgraph.checkpoint.memory import MemorySaver
 
 memory = MemorySaver()
@@ -9,21 +9,28 @@ def generate_core_agent():
     
     builder = StateGraph(AgentCreatorState)
     
+    builder.add_node("summarize_history", summarize_history)
     builder.add_node("step_planner", step_planner)
     builder.add_node(NextStep.UPDATE_BLUEPRINT, update_blueprint)
     builder.add_node(NextStep.ASK_FOLLOWUP, ask_followup)
     builder.add_node(NextStep.GENERATE_AGENT, generate_agent)
     
     
-    builder.add_edge(
+    builder.add_conditional_edges(
         START,
-        "step_planner"
+        route_from_start,
+        {
+            "summarize_history",
+            "step_planner"
+        }
     )
+    builder.add_edge("summarize_history", "step_planner")
     
     builder.add_conditional_edges( 
         "step_planner",
         route_to_step,
         {
+            "step_planner",
             NextStep.UPDATE_BLUEPRINT,
             NextStep.ASK_FOLLOWUP,
             NextStep.GENERATE_AGENT
@@ -38,4 +45,11 @@ def generate_core_agent():
     return builder.compile(checkpointer=memory)
 
 
-    
\ No newline at end of file
+_core_agent = None
+
+def get_core_agent():
+    """Return the compiled core agent, building it on first use."""
+    global _core_agent
+    if _core_agent is None:
+        _core_agent = generate_core_agent()
+    return _core_agent
@@ -1,8 +1,13 @@
 from enum import Enum
+from typing import Optional
+from pydantic import BaseModel, Field
 
 class NextStep(str, Enum):
         UPDATE_BLUEPRINT = "update_blueprint"
         ASK_FOLLOWUP = "ask_followup"
         GENERATE_AGENT = "generate_agent"
         EVALUATE_BLUEPRINT = "evaluate_blueprint"
-        
\ No newline at end of file
+
+class PlannerResponse(BaseModel):
+        next_step: NextStep = Field(description="Next step to do")
+        updated_blueprint: Optional[str] = Field(None, description="Full updated blueprint, only when next step is update_blueprint")
@@ -1,55 +1,91 @@
 from agents_forge.core_agent.utils.state import AgentCreatorState
-from langchain_openai import ChatOpenAI
-from pydantic import BaseModel, Field
-from typing import Literal
-from langchain_core.messages import AIMessage, SystemMessage
-from enum import Enum
-from agents_forge.core_agent.utils.helper_models import NextStep
+from pydantic import ValidationError
+from typing import Dict, Optional
+from langchain_core.messages import AIMessage, RemoveMessage, SystemMessage
+from agents_forge.core_agent.utils.helper_models import NextStep, PlannerResponse
+from agents_forge.agents_generation.node_types import get_llm, get_json_llm, get_tool_llm, parse_json_reply, tool_call_arguments
 from agents_forge.agents_generation.config_schema import AgentConfig
+import hashlib
+import json
 import logging
 
+__all__ = [
+    "NextStep",
+    "route_from_start",
+    "summarize_history",
+    "step_planner",
+    "route_to_step",
+    "update_blueprint",
+    "ask_followup",
+    "generate_agent",
+    "warm_up_clients",
+]
+
 # Configure logger
 logger = logging.getLogger(__name__)
 
+# Models used by the core agent: short questions and summaries go to the faster, cheaper
+# model; the planner (which may write the blueprint), blueprint updates and agent
+# generation keep the stronger one
+DEFAULT_MODEL = "gpt-4o-mini"
+FAST_MODEL = "gpt-4.1-nano"
 
+# Output budget per node. The planner may include a full blueprint, and agent configs
+# get extra room because a truncated config can't be parsed at all
+MAX_TOKENS = {
+    "summarize_history": 512,
+    "step_planner": 2048,
+    "update_blueprint": 2048,
+    "ask_followup": 512,
+    "generate_agent": 4096,
+}
 
-def step_planner(state: AgentCreatorState) -> AgentCreatorState:
-    """Plan the next step in agent creation based on user input and current state."""
-    logger.info(f"Executing step_planner with blueprint: {state.agent_blueprint}")
+# Once the conversation is longer than this, its older half is folded into the summary
+SUMMARIZE_AFTER_MESSAGES = 8
+
+# Planner decisions keyed by a digest of the blueprint, summary and latest user message, oldest first
+MAX_CACHED_PLANS = 512
+_plan_cache: Dict[str, PlannerResponse] = {}
+
+# Why the last generated config for a blueprint was rejected, keyed by a digest of the blueprint
+MAX_GENERATION_FAILURES = 128
+_generation_failures: Dict[str, str] = {}
+
+# Attempts generate_agent makes before giving up and reporting why the config was rejected
+MAX_GENERATION_ATTEMPTS = 2
+
+def _plan_cache_key(state: AgentCreatorState) -> str:
+    """
+    Build a planner cache key from the blueprint, the summary and the latest user message.
     
-    system_prompt = SystemMessage(content=f"""
+    The planner's own "Next step" and blueprint messages are left out: they change on every
+    call, so including them would make every key unique.
+    """
+    last_user_message = next((message.content for message in reversed(state["messages"]) if message.type == "human"), "")
+    payload = [state.get("agent_blueprint", ""), state.get("summary", ""), last_user_message]
+    return hashlib.blake2b(json.dumps(payload, default=str).encode()).hexdigest()
+
+# Static node instructions. They are sent first, as their own system message, so every
+# call starts with the same byte-identical prefix that the provider can cache; the
+# per-call blueprint and messages follow in a separate context message.
+STEP_PLANNER_PROMPT = SystemMessage(content="""
 You're expert agent creator. Based on current state decide what is best next step to do:
 1) UPDATE_BLUEPRINT - when you know more from mesages thats already in blueprint -> always do this and keep blueprint updated
 2) ASK_FOLLOWUP - when you need more information from user to create a good agent
 3) GENERATE_AGENT - when you have enough information to generate a custom agent, and your blueprint is fully updated
 
-Blueprint: {state.agent_blueprint if state.agent_blueprint else "No blueprint yet"}
-Message: {state.messages}
-
-Respond with the next step:
+When you choose UPDATE_BLUEPRINT, also write the full updated blueprint in updated_blueprint: specific about the
+agent's purpose, capabilities and limitations, built from 3-7 atomic "llm" or "web_search" nodes.
 """)
-    
-    class PlannerResponse(BaseModel):
-        next_step: NextStep = Field(description="Next step to do")
-        
-    logger.info("Querying LLM for step planning")
-    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.1).with_structured_output(PlannerResponse, method="json_schema")
-    
-    # Create a combined message list with system prompt
-    response = llm.invoke([system_prompt])
-    logger.info(f"LLM responded with next step: {response.next_step}")
-    
-    return { "planned_step": response.next_step, "messages": [AIMessage(content="Next step: " + response.next_step)] }
 
-def route_to_step(state: AgentCreatorState) -> AgentCreatorState:
-    logger.info(f"Routing to step: {state.planned_step}")
-    return state.planned_step
-    
-def update_blueprint(state: AgentCreatorState) -> AgentCreatorState:
-    """Update the agent blueprint based on user feedback."""
-    logger.info("Executing update_blueprint")
-    
-    system_prompt = [SystemMessage(content=f"""
+STEP_PLANNER_CONTEXT = """
+Blueprint: {blueprint}
+Conversation summary: {summary}
+
+Respond with the next step based on the conversation that follows:
+"""
+
+UPDATE_BLUEPRINT_PROMPT = SystemMessage(content="""
 You're an AI agent blueprint designer. Your task is to create or update a blueprint for an AI agent based on user requirements.
 
 A good agent blueprint should:
@@ -68,29 +104,16 @@ AGENT DESIGN PRINCIPLES:
 - Each node should be atomic with a clear input and output
 - Design for reliability with clear step purposes
 - Consider parallel paths for concurrent operations when appropriate
+""")
 
-Current blueprint: {state.agent_blueprint if state.agent_blueprint else "No blueprint yet"}
-Messages: {state.messages}
-""")]
-    
-    
-    
-    logger.info("Querying LLM for blueprint update")
-    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.1)
-    response = llm.invoke(system_prompt)
-    logger.info("LLM responded with updated blueprint")
-    
-    return { "agent_blueprint": response.content, "messages": [AIMessage(content="Updated blueprint: " + response.content)] }
+UPDATE_BLUEPRINT_CONTEXT = """
+Current blueprint: {blueprint}
+Conversation summary: {summary}
+"""
 
-def ask_followup(state: AgentCreatorState) -> AgentCreatorState:
-    """Ask a followup question to gather more information from the user."""
-    logger.info("Executing ask_followup")
-    
-    system_prompt = [SystemMessage(content=f"""
+ASK_FOLLOWUP_PROMPT = SystemMessage(content="""
 You're an expert agent creator assistant. You need to ask the user follow-up questions to gather more information to build a high-quality agent.
 
-Current blueprint: {state.agent_blueprint if state.agent_blueprint else "No blueprint yet"}
-
 AVAILABLE NODE TYPES:
 1. "llm" - Language model interaction nodes for processing information, generating content, or making decisions
 2. "web_search" - Internet search nodes for retrieving real-time information from the web
@@ -112,22 +135,14 @@ Your task is to ask insightful, specific questions that will help you understand
 solve the overall problem
 
 Ask only the most important questions needed right now. Be concise but friendly.
-""")]
-    
+""")
 
-    
-    logger.info("Querying LLM for followup question")
-    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.1)
-    response = llm.invoke(system_prompt + state.messages)
-    logger.info("LLM responded with followup question")
-    
-    return { "messages": [AIMessage(content="Followup question: " + response.content)] }
+ASK_FOLLOWUP_CONTEXT = """
+Current blueprint: {blueprint}
+Conversation summary: {summary}
+"""
 
-def generate_agent(state: AgentCreatorState) -> AgentCreatorState:
-    """Generate an agent configuration based on the blueprint."""
-    logger.info(f"Executing generate_agent with blueprint: {state.agent_blueprint}")
-    
-    system_prompt = f"""
+GENERATE_AGENT_PROMPT = SystemMessage(content="""
         You're an expert agent creator. Your task is to generate a JSON configuration for an agent based on the blueprint.
         
         UNDERSTANDING AGENTS:
@@ -198,16 +213,283 @@ def generate_agent(state: AgentCreatorState) -> AgentCreatorState:
         4. Final llm node prepares the complete report
         
         Based on the blueprint below, create a complete agent configuration with appropriate nodes and edges:
+    """)
+
+SUMMARIZE_HISTORY_PROMPT = SystemMessage(content="""
+You maintain a short running summary of a conversation between a user and an agent creator.
+Extend the previous summary with the new messages. Keep every requirement, decision and open question
+about the agent being designed, drop small talk, and answer with the summary only.
+""")
+
+SUMMARIZE_HISTORY_CONTEXT = """
+Previous summary: {summary}
+New messages: {messages}
+"""
+
+GENERATE_AGENT_CONTEXT = """
+        {blueprint}
+        Conversation summary: {summary}
+    """
+
+
+
+def find_config_problem(config: AgentConfig) -> Optional[str]:
+    """
+    Check a generated config against the graph rules given to the model.
+    
+    Args:
+        config: The generated agent configuration
         
-        {state.agent_blueprint}
-        {state.messages}
+    Returns:
+        A short description of the first problem found, or None if the config is usable
+    """
+    node_ids = {node.id for node in config.nodes}
+    if len(node_ids) != len(config.nodes):
+        return "node ids are not unique"
+    
+    successors: Dict[str, list] = {node_id: [] for node_id in node_ids}
+    successors["START"] = []
+    for edge in config.edges:
+        if edge.source not in successors:
+            return f"edge source {edge.source!r} is not a node"
+        if edge.target != "END" and edge.target not in node_ids:
+            return f"edge target {edge.target!r} is not a node"
+        successors[edge.source].append(edge.target)
+    
+    if not successors["START"]:
+        return "no edge starts at START"
+    if not any(edge.target == "END" for edge in config.edges):
+        return "no edge ends at END"
+    
+    # Walk from START; meeting a node that is still on the path means a loop
+    visited, on_path = set(), set()
+    def visit(node_id: str) -> Optional[str]:
+        if node_id in on_path:
+            return f"the edges form a loop through {node_id!r}"
+        if node_id in visited or node_id == "END":
+            return None
+        visited.add(node_id)
+        on_path.add(node_id)
+        for target in successors[node_id]:
+            problem = visit(target)
+            if problem:
+                return problem
+        on_path.discard(node_id)
+        return None
+    
+    problem = visit("START")
+    if problem:
+        return problem
+    unreachable = node_ids - visited
+    if unreachable:
+        return f"nodes {sorted(unreachable)} can't be reached from START"
+    return None
+
+def warm_up_clients() -> None:
     """
+    Build every LLM client the core agent uses ahead of the first request.
     
-    # LLM with structured output using the AgentConfig schema
+    Importing langchain_openai and constructing the clients takes a noticeable moment;
+    doing it early (e.g. in a worker thread while the user types) keeps it off the first
+    turn. The clients are cached, so the nodes pick up these instances.
+    """
+    get_llm(FAST_MODEL, 0.0)
+    get_llm(FAST_MODEL, 0.1)
+    get_llm(DEFAULT_MODEL, 0.1)
+    get_json_llm(DEFAULT_MODEL, 0.1, PlannerResponse)
+    get_tool_llm(DEFAULT_MODEL, 0.1, AgentConfig)
+
+def compact_text(text: str) -> str:
+    """
+    Strip blank lines, indentation and repeated spaces from generated text.
+    
+    The blueprint is resent in every later prompt, so layout whitespace is paid for on
+    every turn; the content itself is kept as-is.
+    """
+    return "\n".join(" ".join(line.split()) for line in text.splitlines() if line.strip())
+
+def format_transcript(messages) -> str:
+    """Render messages as compact "role: content" lines for prompts that quote a conversation."""
+    return "\n".join(f"{message.type}: {message.content}" for message in messages)
+
+def route_from_start(state: AgentCreatorState) -> str:
+    """Summarize the history first when the conversation has grown too long."""
+    if len(state["messages"]) > SUMMARIZE_AFTER_MESSAGES:
+        return "summarize_history"
+    return "step_planner"
+
+async def summarize_history(state: AgentCreatorState) -> AgentCreatorState:
+    """Fold the older half of the conversation into the rolling summary."""
+    older_messages = state["messages"][:len(state["messages"]) // 2]
+    logger.info("Executing summarize_history for %d messages", len(older_messages))
+    
+    context = SystemMessage(content=SUMMARIZE_HISTORY_CONTEXT.format(summary=state.get("summary") or "None", messages=format_transcript(older_messages)))
+    llm = get_llm(FAST_MODEL, 0.0)
+    response = await llm.ainvoke([SUMMARIZE_HISTORY_PROMPT, context], max_tokens=MAX_TOKENS["summarize_history"], extra_body={"prompt_cache_key": "summarize_history"})
+    logger.info("LLM responded with conversation summary")
+    
+    # Summarized messages are removed from the state so later prompts stay bounded
+    return { "summary": response.content, "messages": [RemoveMessage(id=message.id) for message in older_messages] }
+
+async def step_planner(state: AgentCreatorState) -> AgentCreatorState:
+    """Plan the next step in agent creation based on user input and current state."""
+    logger.info("Executing step_planner with a %d-character blueprint", len(state.get("agent_blueprint", "")))
+    logger.debug("Blueprint: %s", state.get("agent_blueprint", ""))
+    
+    # The planner only picks one of a few steps, so the same inputs can reuse its decision
+    cache_key = _plan_cache_key(state)
+    response = _plan_cache.get(cache_key)
+    if response is not None:
+        logger.info("Reusing cached next step: %s", response.next_step)
+    else:
+        context = SystemMessage(content=STEP_PLANNER_CONTEXT.format(blueprint=state.get("agent_blueprint") or "No blueprint yet", summary=state.get("summary") or "None"))
+        
+        logger.info("Querying LLM for step planning")
+        llm = get_json_llm(DEFAULT_MODEL, 0.1, PlannerResponse)
+        
+        # Create a combined message list with system prompt
+        reply = await llm.ainvoke([STEP_PLANNER_PROMPT, context, *state["messages"]], max_tokens=MAX_TOKENS["step_planner"], extra_body={"prompt_cache_key": "step_planner"})
+        response = parse_json_reply(PlannerResponse, reply)
+        logger.info("LLM responded with next step: %s", response.next_step)
+        
+        if len(_plan_cache) >= MAX_CACHED_PLANS:
+            del _plan_cache[next(iter(_plan_cache))]
+        _plan_cache[cache_key] = response
+    
+    next_step = response.next_step
+    next_step_message = AIMessage(content="Next step: " + next_step)
+    
+    # The planner can write the updated blueprint itself, which saves the update_blueprint call
+    if next_step == NextStep.UPDATE_BLUEPRINT and response.updated_blueprint:
+        logger.info("Planner updated the blueprint inline")
+        blueprint = compact_text(response.updated_blueprint)
+        return {
+            "planned_step": next_step,
+            "blueprint_updated": True,
+            "agent_blueprint": blueprint,
+            "messages": [next_step_message, AIMessage(content="Updated blueprint: " + blueprint)],
+        }
+    
+    return { "planned_step": next_step, "blueprint_updated": False, "messages": [next_step_message] }
+
+def route_to_step(state: AgentCreatorState) -> str:
+    logger.info("Routing to step: %s", state.get("planned_step"))
+    # Route on the plain string value so the branch lookup doesn't go through the enum
+    planned_step = state.get("planned_step")
+    planned_step = planned_step.value if isinstance(planned_step, NextStep) else planned_step
+    
+    # Nothing new to put in the blueprint: another update (inline or not) would only send the
+    # graph back to the planner, so ask the user instead. Checked before the inline-update
+    # branch so a planner that keeps updating inline can't loop
+    if planned_step == NextStep.UPDATE_BLUEPRINT and not _has_new_user_input(state):
+        logger.info("Blueprint already reflects the latest user message, asking a followup instead")
+        return NextStep.ASK_FOLLOWUP.value
+    
+    # The blueprint is already updated, so plan again right away
+    if state.get("blueprint_updated", False):
+        return "step_planner"
+    
+    # Cheap guard against a planner choice that can only waste an LLM call
+    if planned_step == NextStep.GENERATE_AGENT and not state.get("agent_blueprint", ""):
+        logger.info("No blueprint to generate from yet, updating it first")
+        return NextStep.UPDATE_BLUEPRINT.value
+    return planned_step
+
+def _has_new_user_input(state: AgentCreatorState) -> bool:
+    """
+    Return whether the user said anything since the blueprint was last updated.
+    
+    An inline update written by the planner step being routed is skipped: it is the update
+    under consideration, not an earlier one.
+    """
+    skip_updates = 1 if state.get("blueprint_updated", False) else 0
+    for message in reversed(state["messages"]):
+        if message.type == "human":
+            return True
+        if message.type == "ai" and message.content.startswith("Updated blueprint: "):
+            if skip_updates:
+                skip_updates -= 1
+                continue
+            return False
+    return True
+    
+async def update_blueprint(state: AgentCreatorState) -> AgentCreatorState:
+    """Update the agent blueprint based on user feedback."""
+    logger.info("Executing update_blueprint")
+    
+    system_prompt = [UPDATE_BLUEPRINT_PROMPT, SystemMessage(content=UPDATE_BLUEPRINT_CONTEXT.format(blueprint=state.get("agent_blueprint") or "No blueprint yet", summary=state.get("summary") or "None"))]
+    
+    
+    
+    logger.info("Querying LLM for blueprint update")
+    llm = get_llm(DEFAULT_MODEL, 0.1)
+    response = await llm.ainvoke(system_prompt + state["messages"], max_tokens=MAX_TOKENS["update_blueprint"], extra_body={"prompt_cache_key": "update_blueprint"})
+    logger.info("LLM responded with updated blueprint")
+    
+    blueprint = compact_text(response.content)
+    return { "agent_blueprint": blueprint, "messages": [AIMessage(content="Updated blueprint: " + blueprint)] }
+
+async def ask_followup(state: AgentCreatorState) -> AgentCreatorState:
+    """Ask a followup question to gather more information from the user."""
+    logger.info("Executing ask_followup")
+    
+    system_prompt = [ASK_FOLLOWUP_PROMPT, SystemMessage(content=ASK_FOLLOWUP_CONTEXT.format(blueprint=state.get("agent_blueprint") or "No blueprint yet", summary=state.get("summary") or "None"))]
+    
+
+    
+    logger.info("Querying LLM for followup question")
+    llm = get_llm(FAST_MODEL, 0.1)
+    response = await llm.ainvoke(system_prompt + state["messages"], max_tokens=MAX_TOKENS["ask_followup"], extra_body={"prompt_cache_key": "ask_followup"})
+    logger.info("LLM responded with followup question")
+    
+    return { "messages": [AIMessage(content="Followup question: " + response.content)] }
+
+async def generate_agent(state: AgentCreatorState) -> AgentCreatorState:
+    """Generate an agent configuration based on the blueprint."""
+    logger.info("Executing generate_agent with a %d-character blueprint", len(state.get("agent_blueprint", "")))
+    logger.debug("Blueprint: %s", state.get("agent_blueprint", ""))
+    
+    system_prompt = [GENERATE_AGENT_PROMPT, SystemMessage(content=GENERATE_AGENT_CONTEXT.format(blueprint=state.get("agent_blueprint", ""), summary=state.get("summary") or "None"))]
+    
+    # LLM answering through a function call with the AgentConfig schema
     logger.info("Querying LLM for agent generation")
-    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.1).with_structured_output(AgentConfig, method="json_schema")
+    llm = get_tool_llm(DEFAULT_MODEL, 0.1, AgentConfig)
     
-    config = llm.invoke([system_prompt])
-    logger.info(f"LLM responded with agent configuration: {config.agent_name}")
+    failure_key = hashlib.blake2b(state.get("agent_blueprint", "").encode()).hexdigest()
+    for attempt in range(MAX_GENERATION_ATTEMPTS):
+        # Remind the model why its last config for this blueprint was rejected
+        messages = system_prompt + state["messages"]
+        previous_failure = _generation_failures.get(failure_key)
+        if previous_failure:
+            messages.append(SystemMessage(content=f"AVOID: a previous configuration for this blueprint was rejected because {previous_failure}"))
+        
+        # Validate once; generate_agent_from_config reuses the resulting instance without
+        # validating it again. A missing tool call or invalid arguments count as a rejected attempt
+        reply = await llm.ainvoke(messages, max_tokens=MAX_TOKENS["generate_agent"], extra_body={"prompt_cache_key": "generate_agent"})
+        arguments = tool_call_arguments(reply)
+        config = None
+        if arguments is None:
+            problem = "the reply didn't call the AgentConfig tool"
+        else:
+            try:
+                config = AgentConfig.model_validate(arguments)
+            except ValidationError as error:
+                problem = f"the configuration didn't match the schema ({error.error_count()} errors)"
+            else:
+                logger.info("LLM responded with agent configuration: %s", config.agent_name)
+                problem = find_config_problem(config)
+        
+        if problem is None:
+            _generation_failures.pop(failure_key, None)
+            break
+        
+        logger.warning("Generated configuration rejected (attempt %d): %s", attempt + 1, problem)
+        if failure_key not in _generation_failures and len(_generation_failures) >= MAX_GENERATION_FAILURES:
+            del _generation_failures[next(iter(_generation_failures))]
+        _generation_failures[failure_key] = problem
     
+    # Don't hand out a config that breaks the graph rules; clear any earlier one so it can't be
+    # saved by mistake, and tell the user why generation failed
+    if problem is not None:
+        return { "agent_config": None, "messages": [AIMessage(content=f"Could not generate a valid agent configuration: {problem}. Please adjust the requirements or try again.")]}
     return { "agent_config": config , "messages": [AIMessage(content="Generated agent configuration: " + config.agent_name)]}
\ No newline at end of file
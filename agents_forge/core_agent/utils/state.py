@@ -1,13 +1,26 @@
 from langgraph.graph.message import add_messages
 from langchain_core.messages import AnyMessage
-from pydantic import BaseModel, Field
-from typing import List, Dict, Any, Annotated
+from typing import List, Annotated, Optional
+from typing_extensions import TypedDict
 from agents_forge.agents_generation.config_schema import AgentConfig
 from agents_forge.core_agent.utils.helper_models import NextStep
 
-class AgentCreatorState(BaseModel):
-    """State class for AgentCreator agent."""
+class AgentCreatorState(TypedDict, total=False):
+    """
+    State class for AgentCreator agent.
+    
+    A TypedDict rather than a pydantic model, so LangGraph passes the channels through
+    without validating the whole state (and every message) at each node boundary.
+    Only messages is always present; nodes read the other keys with their defaults.
+    """
     messages: Annotated[List[AnyMessage], add_messages]
-    agent_blueprint: str = Field(description="Blueprint for the agent that will be created", default="")
-    agent_config: AgentConfig = Field(description="Final configuration for the agent that will be created", default=None)
-    planned_step: NextStep = Field(description="Planned step for the agent that will be created", default=None)   
\ No newline at end of file
+    # Blueprint for the agent that will be created (default "")
+    agent_blueprint: str
+    # Final configuration for the agent that will be created (None after a failed generation)
+    agent_config: Optional[AgentConfig]
+    # Planned step for the agent that will be created
+    planned_step: NextStep
+    # Whether the planner already updated the blueprint itself (default False)
+    blueprint_updated: bool
+    # Rolling summary of the messages dropped from the conversation (default "")
+    summary: str
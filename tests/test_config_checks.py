@@ -0,0 +1,47 @@
+from agents_forge.agents_generation.config_schema import AgentConfig
+from agents_forge.core_agent.utils.nodes import find_config_problem
+
+
+def make_config(edges, node_ids=("search", "summarize")):
+    return AgentConfig.model_validate({
+        "agent_name": "test_agent",
+        "description": "Agent used in tests",
+        "nodes": [
+            {"id": node_id, "type": "llm", "objective": "Do one thing", "model_name": "gpt-4o-mini", "temperature": 0.1}
+            for node_id in node_ids
+        ],
+        "edges": [{"source": source, "target": target} for source, target in edges],
+    })
+
+
+def test_valid_config_has_no_problem():
+    config = make_config([("START", "search"), ("search", "summarize"), ("summarize", "END")])
+    assert find_config_problem(config) is None
+
+
+def test_parallel_paths_are_not_a_loop():
+    config = make_config(
+        [("START", "a"), ("a", "b"), ("a", "c"), ("b", "d"), ("c", "d"), ("d", "END")],
+        node_ids=("a", "b", "c", "d"),
+    )
+    assert find_config_problem(config) is None
+
+
+def test_loop_is_detected():
+    config = make_config([("START", "search"), ("search", "summarize"), ("summarize", "search"), ("summarize", "END")])
+    assert "loop" in find_config_problem(config)
+
+
+def test_dangling_target_is_detected():
+    config = make_config([("START", "search"), ("search", "missing"), ("search", "summarize"), ("summarize", "END")])
+    assert "'missing' is not a node" in find_config_problem(config)
+
+
+def test_dangling_source_is_detected():
+    config = make_config([("START", "search"), ("missing", "summarize"), ("search", "summarize"), ("summarize", "END")])
+    assert "'missing' is not a node" in find_config_problem(config)
+
+
+def test_unreachable_node_is_detected():
+    config = make_config([("START", "search"), ("search", "END")])
+    assert "can't be reached" in find_config_problem(config)
@@ -0,0 +1,75 @@
+import asyncio
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from agents_forge.core_agent.utils import nodes
+from agents_forge.core_agent.utils.helper_models import NextStep
+
+
+def make_state(planned_step, messages, blueprint="A research agent", blueprint_updated=False):
+    return {
+        "planned_step": planned_step,
+        "messages": messages,
+        "agent_blueprint": blueprint,
+        "blueprint_updated": blueprint_updated,
+    }
+
+
+def test_update_without_new_input_asks_followup():
+    state = make_state(NextStep.UPDATE_BLUEPRINT, [
+        HumanMessage(content="I need a research agent"),
+        AIMessage(content="Next step: update_blueprint"),
+        AIMessage(content="Updated blueprint: A research agent"),
+    ])
+    assert nodes.route_to_step(state) == NextStep.ASK_FOLLOWUP.value
+
+
+def test_update_after_new_input_is_kept():
+    state = make_state(NextStep.UPDATE_BLUEPRINT, [
+        AIMessage(content="Updated blueprint: A research agent"),
+        HumanMessage(content="It should also search the web"),
+    ])
+    assert nodes.route_to_step(state) == NextStep.UPDATE_BLUEPRINT.value
+
+
+def test_generate_without_blueprint_updates_it_first():
+    state = make_state(NextStep.GENERATE_AGENT, [HumanMessage(content="Build it")], blueprint="")
+    assert nodes.route_to_step(state) == NextStep.UPDATE_BLUEPRINT.value
+
+
+def test_inline_blueprint_update_plans_again():
+    state = make_state(NextStep.UPDATE_BLUEPRINT, [HumanMessage(content="Hi")], blueprint_updated=True)
+    assert nodes.route_to_step(state) == "step_planner"
+
+
+def test_repeated_inline_update_asks_followup():
+    state = make_state(NextStep.UPDATE_BLUEPRINT, [
+        HumanMessage(content="I need a research agent"),
+        AIMessage(content="Next step: update_blueprint"),
+        AIMessage(content="Updated blueprint: A research agent"),
+        AIMessage(content="Next step: update_blueprint"),
+        AIMessage(content="Updated blueprint: A research agent that cites sources"),
+    ], blueprint_updated=True)
+    assert nodes.route_to_step(state) == NextStep.ASK_FOLLOWUP.value
+
+
+class FakePlannerLLM:
+    """Planner client that always updates the blueprint inline."""
+
+    async def ainvoke(self, messages, **kwargs):
+        return AIMessage(content='{"next_step": "update_blueprint", "updated_blueprint": "A research agent that cites sources"}')
+
+
+def test_planner_writes_inline_blueprint_update(monkeypatch):
+    monkeypatch.setattr(nodes, "get_json_llm", lambda *args: FakePlannerLLM())
+    monkeypatch.setattr(nodes, "_plan_cache", {})
+    state = make_state(None, [HumanMessage(content="It should cite its sources")])
+
+    result = asyncio.run(nodes.step_planner(state))
+
+    assert result["planned_step"] == NextStep.UPDATE_BLUEPRINT
+    assert result["blueprint_updated"] is True
+    assert result["agent_blueprint"] == "A research agent that cites sources"
+    assert result["messages"][-1].content == "Updated blueprint: A research agent that cites sources"
+    # With the user's message already applied, the router plans again instead of updating twice
+    assert nodes.route_to_step({**state, **result, "messages": state["messages"] + result["messages"]}) == "step_planner"
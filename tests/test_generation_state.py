@@ -0,0 +1,30 @@
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from agents_forge.agents_generation.state import MAX_HISTORY_MESSAGES, bounded_add_messages
+
+
+def conversation(count):
+    return [HumanMessage(content=f"message {i}", id=str(i)) for i in range(count)]
+
+
+def test_short_history_is_kept_whole():
+    history = conversation(3)
+    merged = bounded_add_messages(history, [AIMessage(content="reply", id="reply")])
+    assert [message.id for message in merged] == ["0", "1", "2", "reply"]
+
+
+def test_long_history_keeps_most_recent_messages():
+    merged = bounded_add_messages(conversation(MAX_HISTORY_MESSAGES), [AIMessage(content="reply", id="reply")])
+    assert len(merged) == MAX_HISTORY_MESSAGES
+    assert merged[0].id == "1"
+    assert merged[-1].id == "reply"
+
+
+def test_trimming_keeps_leading_system_messages():
+    system = [SystemMessage(content="rules", id="system-1"), SystemMessage(content="more rules", id="system-2")]
+    merged = bounded_add_messages(system + conversation(MAX_HISTORY_MESSAGES), [AIMessage(content="reply", id="reply")])
+
+    assert len(merged) == MAX_HISTORY_MESSAGES
+    assert [message.id for message in merged[:2]] == ["system-1", "system-2"]
+    assert merged[2].type == "human"
+    assert merged[-1].id == "reply"